@@ -10,6 +10,7 @@ Two modes:
 
 CLI:
     python applyTransform.py [--force] [--dry-run] [--mode scan|manifest] [--manifest-csv PATH]
+                             [--interpolator linear|bSpline|welchWindowedSinc]
 
 Manifest CSV schema (headers required unless noted):
     moving,reference,transforms[,output,fish_id,label]
@@ -21,7 +22,8 @@ Manifest CSV schema (headers required unless noted):
       fish_id     : optional, for logging
       label       : optional, for logging
 
-Dependencies: antspyx (ants), tqdm, pandas
+Dependencies: antspyx (ants, imported on first transform), tqdm, pandas; optional: pynrrd (header probe), SimpleITK (output compression level),
+              psutil (worker thread-count log)
 """
 
 import os
@@ -30,18 +32,83 @@ import getpass
 import socket
 import traceback
 from pathlib import Path
-import ants  # ANTsPy (antspyx) is required
 from tqdm import tqdm
+import numpy as np
 import pandas as pd
 import datetime
+import json
+import csv
 import concurrent.futures
 import multiprocessing
+from multiprocessing import shared_memory
+import threading
 import argparse
+import functools
+import collections
 import re
+import tempfile
+import shutil
+import time
 
-def prompt_owner_and_fishid(nas_root):
+try:
+    import nrrd  # pynrrd (optional): cheap header probe before the full ITK decode
+except ImportError:
+    nrrd = None
+
+try:
+    import SimpleITK as sitk  # optional: lets us choose the DEFLATE level when writing outputs
+except ImportError:
+    sitk = None
+
+try:
+    import psutil  # optional: per-process thread count for the worker pinning log
+except ImportError:
+    psutil = None
+
+MANIFEST_INPUT_COLUMNS = {'moving', 'reference', 'transforms', 'output', 'fish_id', 'label'}
+MANIFEST_FIELDS = ['fish_id', 'transformation', 'status', 'date', 'user', 'input', 'output', 'error', 'interpolator']
+
+_nat_re = re.compile(r'(\d+)')
+
+def natkey(s):
+    """
+    Natural-sort key: split digit runs so 'f2' sorts before 'f10'.
+    """
+    return [int(t) if t.isdigit() else t for t in _nat_re.split(s)]
+
+def list_fish_ids(fish_root, index_path=None, refresh=False):
+    """
+    Naturally sorted fish directory names under fish_root.
+    With index_path, the listing is cached in a JSON index keyed on fish_root and reused while
+    the directory's mtime is unchanged (adding/removing a fish dir bumps it); refresh forces a rescan.
+    """
+    fish_root_str = str(fish_root)
+    root_mtime = os.stat(fish_root_str).st_mtime_ns
+    index = {}
+    if index_path is not None and Path(index_path).exists():
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        entry = index.get(fish_root_str)
+        if not refresh and entry and entry.get("mtime_ns") == root_mtime:
+            return entry["fish"]
+    with os.scandir(fish_root_str) as it:
+        fishids = sorted((e.name for e in it if e.is_dir() and not e.name.startswith('.')), key=natkey)
+    if index_path is not None:
+        index[fish_root_str] = {"mtime_ns": root_mtime, "fish": fishids}
+        try:
+            with open(index_path, "w") as f:
+                json.dump(index, f)
+        except OSError as e:
+            print(f"[WARN] Could not write fish index {index_path}: {e}")
+    return fishids
+
+def prompt_owner_and_fishid(nas_root, index_path=None, refresh=False):
     """
     Prompt user for owner and fishid, print available options, and return (owner, fishids).
+    Fish listings are cached in index_path (see list_fish_ids) when given.
     """
     nas_root = Path(nas_root)
     owners = [d.name for d in nas_root.iterdir() if d.is_dir() and not d.name.startswith('.')]
@@ -53,7 +120,7 @@ def prompt_owner_and_fishid(nas_root):
         print(f"[ERROR] Owner '{owner}' not found in {nas_root}. Exiting.")
         exit(1)
     fish_root = get_owner_root(nas_root, owner)
-    fishids = sorted([d.name for d in fish_root.iterdir() if d.is_dir() and not d.name.startswith('.')], key=lambda x: (''.join([c.zfill(10) if c.isdigit() else c for c in x])))
+    fishids = list_fish_ids(fish_root, index_path=index_path, refresh=refresh)
     print(f"Available fish IDs for owner '{owner}':")
     for f in fishids:
         print(f"  - {f}")
@@ -75,16 +142,306 @@ NAS_ROOT = "/Volumes/jlarsch/default/D2c/07_Data"  # Root NAS directory
 MANIFEST_CSV_DEFAULT = "/Volumes/jlarsch/default/D2c/07_Data/Danin/regManifest/transformManifest.csv"
 BEST_ROUNDS_CSV = "/Volumes/jlarsch/default/D2c/07_Data/Danin/best_rounds.csv"
 USE_REFERENCE_GRID = True                          # Use reference image as output grid
-INTERPOLATOR = "welchWindowedSinc"                # Interpolator for ANTs
+INTERPOLATOR = "bSpline"                          # Default ANTs interpolator (override with --interpolator)
+INTERPOLATOR_CHOICES = ["linear", "bSpline", "welchWindowedSinc"]
+QUANTITATIVE_CHANNELS = []                         # Filename substrings (e.g. gene names) of channels used for quantitative analysis
+QUANTITATIVE_INTERPOLATOR = "welchWindowedSinc"    # Interpolator for QUANTITATIVE_CHANNELS (slowest, most accurate)
+OUTPUT_COMPRESSION = True                          # gzip-compress written .nrrd outputs
+COMPRESSION_LEVEL = 1                              # 1 = fastest DEFLATE (~2x larger files than 9, several x faster); needs SimpleITK
+IO_WORKERS = 4                                     # Threads reading inputs / writing outputs (NAS-latency bound)
+PIPELINE_DEPTH = 8                                 # Max jobs decoded but not yet written (caps memory held in shared buffers)
+COMPOSE_TRANSFORMS = True                          # Collapse multi-transform chains into one displacement field per (reference, chain)
+ITK_THREADS_PER_WORKER = 4                         # ITK threads per transform process; processes = cpu_count // this
+IMAGE_CACHE_SIZE = 4                               # Decoded reference images kept per worker (3D volumes are large)
+NEGATIVE_CACHE_TTL_HOURS = 24                      # Known-missing transform dirs/references are re-probed after this long
 # =================================================
 
-def find_fish_dirs(nas_root, owner):
+@functools.lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def _read_image_cached(path_str, mtime):
     """
-    Returns a list of all fish directories for the given owner.
-    Skips hidden directories.
+    Decode an image once per (path, mtime); mtime in the key invalidates stale entries.
     """
-    fish_root = get_owner_root(nas_root, owner)
-    return [d for d in fish_root.iterdir() if d.is_dir() and not d.name.startswith('.')]
+    import ants
+    return ants.image_read(path_str)
+
+_read_locks = {}
+_read_locks_guard = threading.Lock()
+
+def read_image_cached(path):
+    """
+    Read a reference image through the per-worker LRU cache. The returned ANTsImage is shared
+    between jobs, so callers must treat it as read-only.
+    A per-path lock makes concurrent I/O threads wait for one decode instead of each decoding the same file.
+    """
+    path_str = str(path)
+    with _read_locks_guard:
+        lock = _read_locks.setdefault(path_str, threading.Lock())
+    with lock:
+        return _read_image_cached(path_str, os.path.getmtime(path_str))
+
+def probe_nrrd_header(path):
+    """
+    Validate an .nrrd header without decoding the voxel data.
+    Returns an error string for obviously malformed files, or None if the file looks usable
+    (or cannot be probed because pynrrd is missing / the file is not .nrrd).
+    """
+    path = Path(path)
+    if nrrd is None or path.suffix.lower() != ".nrrd":
+        return None
+    try:
+        header = nrrd.read_header(str(path))
+    except Exception as e:
+        return f"unreadable NRRD header: {e}"
+    sizes = [int(n) for n in header.get("sizes", [])]
+    if not sizes or any(n <= 0 for n in sizes):
+        return f"invalid NRRD sizes {sizes}"
+    if int(header.get("dimension", len(sizes))) != len(sizes):
+        return f"NRRD dimension {header.get('dimension')} does not match sizes {sizes}"
+    return None
+
+def write_image(img, out_path):
+    """
+    Write an ANTsImage, using SimpleITK so the compression level can be chosen.
+    Falls back to ants.image_write (ITK default compression) without SimpleITK or for multi-component images.
+    """
+    if sitk is None or img.components > 1:
+        import ants
+        ants.image_write(img, str(out_path))
+        return
+    write_array_sitk(img.numpy(), img.spacing, img.origin, np.asarray(img.direction), out_path)
+
+def write_array_sitk(arr, spacing, origin, direction, out_path):
+    """
+    Write an (x, y, z)-indexed voxel array with SimpleITK at COMPRESSION_LEVEL.
+    """
+    # ANTs arrays are indexed (x, y, z); SimpleITK expects (z, y, x)
+    out = sitk.GetImageFromArray(arr.T)
+    out.SetSpacing([float(v) for v in spacing])
+    out.SetOrigin([float(v) for v in origin])
+    out.SetDirection([float(v) for v in np.asarray(direction).ravel()])
+    writer = sitk.ImageFileWriter()
+    writer.SetFileName(str(out_path))
+    writer.SetUseCompression(OUTPUT_COMPRESSION)
+    writer.SetCompressionLevel(COMPRESSION_LEVEL)
+    writer.Execute(out)
+
+def write_shared(desc, out_path):
+    """
+    Write a shared-memory image descriptor straight to disk. With SimpleITK this reads the
+    voxels from the shared block directly instead of first rebuilding an ANTsImage.
+    """
+    if sitk is None or desc["components"] > 1:
+        write_image(image_from_shared(desc), out_path)
+        return
+    shm = shared_memory.SharedMemory(name=desc["shm"])
+    try:
+        arr = np.ndarray(desc["shape"], dtype=np.dtype(desc["dtype"]), buffer=shm.buf)
+        write_array_sitk(arr, desc["spacing"], desc["origin"], desc["direction"], out_path)
+        del arr
+    finally:
+        shm.close()
+
+def image_to_shared(img):
+    """
+    Copy an ANTsImage's voxels into a new shared-memory block so a worker process can use them
+    without pickling the volume. Returns (SharedMemory, descriptor); the caller owns and must unlink the block.
+    """
+    arr = img.numpy()
+    shm = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    desc = {
+        "shm": shm.name,
+        "shape": arr.shape,
+        "dtype": arr.dtype.str,
+        "components": img.components,
+        "spacing": tuple(float(v) for v in img.spacing),
+        "origin": tuple(float(v) for v in img.origin),
+        "direction": np.asarray(img.direction).tolist(),
+    }
+    return shm, desc
+
+def image_from_shared(desc):
+    """
+    Rebuild an ANTsImage (own copy of the voxels) from a shared-memory descriptor.
+    """
+    shm = shared_memory.SharedMemory(name=desc["shm"])
+    try:
+        arr = np.array(np.ndarray(desc["shape"], dtype=np.dtype(desc["dtype"]), buffer=shm.buf))
+    finally:
+        shm.close()
+    import ants
+    return ants.from_numpy(
+        arr,
+        origin=desc["origin"],
+        spacing=desc["spacing"],
+        direction=np.asarray(desc["direction"]),
+        has_components=desc["components"] > 1
+    )
+
+def image_geometry(img):
+    """
+    Grid of an ANTsImage (shape, spacing, origin, direction) without its voxels.
+    """
+    return {
+        "shape": tuple(img.shape),
+        "spacing": tuple(float(v) for v in img.spacing),
+        "origin": tuple(float(v) for v in img.origin),
+        "direction": np.asarray(img.direction).tolist(),
+    }
+
+def image_from_geometry(geom):
+    """
+    Blank image on a given grid; enough to act as the fixed image, which only contributes its geometry.
+    """
+    import ants
+    return ants.make_image(
+        geom["shape"],
+        voxval=0,
+        spacing=geom["spacing"],
+        origin=geom["origin"],
+        direction=np.asarray(geom["direction"])
+    )
+
+def unlink_shared(name):
+    """
+    Release a shared-memory block by name (ignores blocks that are already gone).
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+def compose_transform_chain(fixed_geom, transformlist, out_prefix):
+    """
+    Worker-process task: materialize a transform chain as a single displacement field on the fixed grid
+    (given as geometry, see image_geometry). Returns the path of the composed field, which can replace the
+    chain in apply_transforms, or None if ANTs did not produce one.
+    """
+    import ants
+    fixed_img = image_from_geometry(fixed_geom)
+    composed = ants.apply_transforms(
+        fixed=fixed_img,
+        moving=fixed_img,
+        transformlist=transformlist,
+        compose=out_prefix
+    )
+    if not composed or not os.path.exists(str(composed)):
+        return None
+    return str(composed)
+
+def init_transform_worker(itk_threads):
+    """
+    ProcessPool initializer. The pool uses the spawn start method, so ants/ITK are not loaded in this
+    process yet: pinning ITK's thread pool here takes effect when transform_shared first imports ants,
+    so workers x ITK threads does not oversubscribe the cores.
+    """
+    os.environ["ITK_GLOBAL_DEFAULT_NUMBER_OF_THREADS"] = str(itk_threads)
+
+def native_thread_count():
+    """
+    OS threads in this process (psutil if installed, else Linux /proc); None when it cannot be read.
+    """
+    if psutil is not None:
+        return psutil.Process().num_threads()
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Threads:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+_threads_reported = False
+
+def report_worker_threads():
+    """
+    Log once per worker how many threads it really runs after its first resample (ITK's pool is
+    started lazily), to check the ITK_GLOBAL_DEFAULT_NUMBER_OF_THREADS pinning.
+    """
+    global _threads_reported
+    if _threads_reported:
+        return
+    _threads_reported = True
+    n = native_thread_count()
+    print(f"[INFO] Transform worker {os.getpid()}: ITK_GLOBAL_DEFAULT_NUMBER_OF_THREADS="
+          f"{os.environ.get('ITK_GLOBAL_DEFAULT_NUMBER_OF_THREADS')}, {n if n is not None else '?'} OS threads")
+
+def transform_shared(moving_desc, fixed_geom, transformlist, interpolator):
+    """
+    CPU stage, run in a worker process: resample the moving image onto the fixed grid
+    (fixed_geom, or the moving grid if None). The moving image and the result travel as
+    shared-memory descriptors; the parent unlinks all blocks.
+    """
+    import ants
+    moving_img = image_from_shared(moving_desc)
+    fixed_img = moving_img if fixed_geom is None else image_from_geometry(fixed_geom)
+    transformed = ants.apply_transforms(
+        fixed=fixed_img,
+        moving=moving_img,
+        transformlist=transformlist,
+        interpolator=interpolator
+    )
+    report_worker_threads()
+    shm, desc = image_to_shared(transformed)
+    shm.close()
+    return desc
+
+def channel_interpolator(moving, default):
+    """
+    Pick the interpolator for a moving image: QUANTITATIVE_INTERPOLATOR for channels listed in
+    QUANTITATIVE_CHANNELS, otherwise the run default.
+    """
+    name = Path(moving).name
+    if any(tag in name for tag in QUANTITATIVE_CHANNELS):
+        return QUANTITATIVE_INTERPOLATOR
+    return default
+
+# Paths found missing (path -> time of the miss), this run or a recent earlier one
+_negative = {}
+# Paths looked up this run; only these are written back, so the cache stays scoped to the fish being processed
+_negative_queried = set()
+
+def exists_cached(path):
+    """
+    path.exists() that remembers misses, so known-missing transform dirs/references
+    are not probed again on the NAS.
+    """
+    key = str(path)
+    _negative_queried.add(key)
+    if key in _negative:
+        return False
+    if Path(path).exists():
+        return True
+    _negative[key] = time.time()
+    return False
+
+def load_negative_cache(cache_path, ttl_hours=NEGATIVE_CACHE_TTL_HOURS):
+    """
+    Load misses from previous runs without touching the NAS: entries are trusted until they are
+    ttl_hours old, then dropped so the path is probed again.
+    """
+    cache_path = Path(cache_path)
+    if not cache_path.exists():
+        return
+    try:
+        entries = json.loads(cache_path.read_text())
+    except Exception as e:
+        print(f"[WARN] Ignoring unreadable negative cache {cache_path}: {e}")
+        return
+    if not isinstance(entries, dict):
+        return  # older list format carried no timestamps
+    cutoff = time.time() - ttl_hours * 3600
+    _negative.update((p, t) for p, t in entries.items() if isinstance(t, (int, float)) and t >= cutoff)
+
+def save_negative_cache(cache_path):
+    """
+    Persist the misses that were looked up this run (entries for other fish/runs are pruned).
+    """
+    entries = {p: _negative[p] for p in sorted(_negative_queried) if p in _negative}
+    Path(cache_path).write_text(json.dumps(entries, indent=1))
 
 def parse_round_val(val, default):
     """
@@ -110,9 +467,11 @@ def load_best_rounds(csv_path):
     if not csv_path.exists():
         print(f"[WARN] best_rounds.csv not found at {csv_path}; falling back to round1 defaults.")
         return {}
-    df = pd.read_csv(csv_path, dtype=str, encoding="utf-8-sig")
+    df = pd.read_csv(csv_path, usecols=lambda c: c in ("fish_id", "best_round", "num_rounds", "owner"),
+                     dtype=str, encoding="utf-8-sig", engine="c")
     best_map = {}
-    for _, row in df.iterrows():
+    # Plain dicts: row.get() on a dict avoids building a pandas Series per row
+    for row in df.to_dict(orient="records"):
         fish_id = str(row.get("fish_id", "")).strip()
         if not fish_id:
             continue
@@ -138,9 +497,40 @@ def find_hcr_channels(preproc_dir, fish_id, round_num, best_round):
     Finds all non-GCaMP HCR channel .nrrd files for a given fish and round in the new layout.
     """
     round_dir = get_round_dir(preproc_dir, round_num, best_round)
-    if not round_dir.exists():
-        return []
-    return [f for f in round_dir.glob(f"{fish_id}_round{round_num}_channel*.nrrd") if "GCaMP" not in f.name]
+    return list(scan_round_channels(str(round_dir), fish_id, round_num))
+
+@functools.lru_cache(maxsize=1024)
+def scan_round_channels(round_dir_str, fish_id, round_num):
+    """
+    One scandir per preprocessing round dir for the whole run (inputs do not change while we write outputs),
+    shared by job building and metadata. Returns a tuple of Paths.
+    """
+    prefix = f"{fish_id}_round{round_num}_channel"
+    try:
+        with os.scandir(round_dir_str) as it:
+            return tuple(Path(e.path) for e in it if e.name.startswith(prefix) and e.name.lower().endswith(".nrrd") and "GCaMP" not in e.name)
+    except (FileNotFoundError, NotADirectoryError):
+        return ()
+
+def find_transform_pair(tm_dir, stem):
+    """
+    Locate <stem>0GenericAffine.mat and <stem>1Warp.nii.gz with a single directory read
+    (names compared lower-cased, so e.g. .NII.GZ is found too).
+    Returns (affine, warp), either of which may be None.
+    """
+    affine = warp = None
+    stem = stem.lower()
+    with os.scandir(tm_dir) as it:
+        for e in it:
+            name = e.name.lower()
+            if not name.startswith(stem):
+                continue
+            rest = name[len(stem):]
+            if rest == "0genericaffine.mat":
+                affine = Path(e.path)
+            elif rest == "1warp.nii.gz":
+                warp = Path(e.path)
+    return affine, warp
 
 def find_best_to_2p_transforms(reg_dir, fish_id, best_round):
     """
@@ -148,12 +538,11 @@ def find_best_to_2p_transforms(reg_dir, fish_id, best_round):
     """
     stg = "01_rbest-2p"
     tm_dir = reg_dir / stg / "transMatrices"
-    if not tm_dir.exists():
+    if not exists_cached(tm_dir):
         return None, None, stg
-    affine = list(tm_dir.glob(f"{fish_id}_round{best_round}_GCaMP_to_2p_0GenericAffine.mat"))
-    warp = list(tm_dir.glob(f"{fish_id}_round{best_round}_GCaMP_to_2p_1Warp.nii.gz"))
+    affine, warp = find_transform_pair(tm_dir, f"{fish_id}_round{best_round}_GCaMP_to_2p_")
     if affine and warp:
-        return affine[0], warp[0], stg
+        return affine, warp, stg
     return None, None, stg
 
 def find_round_to_best_transforms(reg_dir, fish_id, round_num, best_round):
@@ -162,12 +551,11 @@ def find_round_to_best_transforms(reg_dir, fish_id, round_num, best_round):
     """
     stg = "02_rn-rbest"
     tm_dir = reg_dir / stg / "transMatrices"
-    if not tm_dir.exists():
+    if not exists_cached(tm_dir):
         return None, None, stg
-    affine = list(tm_dir.glob(f"{fish_id}_round{round_num}_GCaMP_to_r{best_round}_0GenericAffine.mat"))
-    warp = list(tm_dir.glob(f"{fish_id}_round{round_num}_GCaMP_to_r{best_round}_1Warp.nii.gz"))
+    affine, warp = find_transform_pair(tm_dir, f"{fish_id}_round{round_num}_GCaMP_to_r{best_round}_")
     if affine and warp:
-        return affine[0], warp[0], stg
+        return affine, warp, stg
     return None, None, stg
 
 def find_reference_2p(preproc_dir, fish_id):
@@ -175,13 +563,15 @@ def find_reference_2p(preproc_dir, fish_id):
     Anatomy 2P reference for best->2P.
     """
     ref = preproc_dir / "2p_anatomy" / f"{fish_id}_anatomy_2P_GCaMP.nrrd"
-    return ref if ref.exists() else None
+    return ref if exists_cached(ref) else None
 
 def find_best_round_reference(preproc_dir, fish_id, best_round):
     """
     Best-round GCaMP reference used for rn->best transforms.
     """
     round_dir = get_round_dir(preproc_dir, best_round, best_round)
+    if not exists_cached(round_dir):
+        return None
     candidates = [
         round_dir / f"{fish_id}_round{best_round}_channel1_GCaMP.nrrd",
         round_dir / f"{fish_id}_round{best_round}_GCaMP.nrrd",
@@ -193,6 +583,22 @@ def find_best_round_reference(preproc_dir, fish_id, best_round):
             return cand
     return None
 
+@functools.lru_cache(maxsize=2048)
+def find_reference_2p_cached(preproc_dir_str, fish_id):
+    """
+    Memoized find_reference_2p keyed on plain strings; returns a path string or None.
+    """
+    ref = find_reference_2p(Path(preproc_dir_str), fish_id)
+    return str(ref) if ref else None
+
+@functools.lru_cache(maxsize=2048)
+def find_best_round_reference_cached(preproc_dir_str, fish_id, best_round):
+    """
+    Memoized find_best_round_reference keyed on plain strings; returns a path string or None.
+    """
+    ref = find_best_round_reference(Path(preproc_dir_str), fish_id, best_round)
+    return str(ref) if ref else None
+
 def normalize_gene(gene_raw):
     """
     Turn gene_probe into gene.probe if possible.
@@ -208,13 +614,8 @@ def list_round_channels(preproc_dir, fish_id, round_num, best_round):
     Enumerate expected non-GCaMP channels for a round (from preprocessing).
     Returns list of dicts with channel, gene, path, mtime.
     """
-    round_dir = get_round_dir(preproc_dir, round_num, best_round)
-    if not round_dir.exists():
-        return []
     channels = []
-    for f in round_dir.glob(f"{fish_id}_round{round_num}_channel*.nrrd"):
-        if "GCaMP" in f.name:
-            continue
+    for f in find_hcr_channels(preproc_dir, fish_id, round_num, best_round):
         m = re.search(r"_channel(\d+)_", f.name)
         if not m:
             continue
@@ -241,23 +642,124 @@ def list_round_channels(preproc_dir, fish_id, round_num, best_round):
         deduped.append(entry)
     return deduped
 
+@functools.lru_cache(maxsize=256)
+def index_aligned_outputs(aligned_dir_str, fish_id):
+    """
+    Read an aligned directory once and index its outputs.
+    Returns dict (round, channel, suffix) -> (Path, gene, mtime), keeping the newest file per key.
+    """
+    pattern = re.compile(rf"{re.escape(fish_id)}_round(\d+)_channel(\d+)_(.*)_in_([^_.]+)\.nrrd$")
+    index = {}
+    try:
+        with os.scandir(aligned_dir_str) as it:
+            for entry in it:
+                m = pattern.match(entry.name)
+                if not m:
+                    continue
+                mtime = entry.stat().st_mtime
+                key = (int(m.group(1)), int(m.group(2)), m.group(4))
+                if key not in index or mtime > index[key][2]:
+                    index[key] = (Path(entry.path), normalize_gene(m.group(3)), mtime)
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    return index
+
 def find_output_for_channel(aligned_dir, fish_id, round_num, ch_num, suffix):
     """
     Find an aligned output for a specific channel/round/suffix (e.g., suffix='2p' or 'r2').
     Returns (Path or None, gene, mtime).
     """
-    pattern = f"{fish_id}_round{round_num}_channel{ch_num}_*_in_{suffix}.nrrd"
-    matches = list(aligned_dir.glob(pattern))
-    if not matches:
+    hit = index_aligned_outputs(str(aligned_dir), fish_id).get((round_num, ch_num, suffix))
+    if hit is None:
         return None, "", None
-    out_file = max(matches, key=lambda f: f.stat().st_mtime)
-    base = out_file.stem
-    suffix_tag = f"_in_{suffix}"
-    if base.endswith(suffix_tag):
-        base = base[: -len(suffix_tag)]
-    gene_part = base.split(f"channel{ch_num}_", 1)[1] if f"channel{ch_num}_" in base else ""
-    gene = normalize_gene(gene_part)
-    return out_file, gene, out_file.stat().st_mtime
+    return hit
+
+def manifest_row_to_job(row, dry_run, listings):
+    """
+    Validate one manifest row and turn it into a job dict.
+    listings maps directory -> set of lower-cased entry names, so existence checks are lookups, not stats
+    (case-insensitive, like the macOS NAS mount: 'x.TIF' in the CSV still finds 'x.tif').
+    Returns None (after printing why) if the row cannot be run.
+    """
+    def exists(path):
+        return path.name.lower() in listings.get(str(path.parent), ())
+
+    moving = Path(row.moving).expanduser()
+    reference = Path(row.reference).expanduser()
+    output_raw = getattr(row, "output", "")
+    output = None
+    transformlist = [t.strip() for t in row.transforms.split(";") if t.strip()]
+    if not exists(moving):
+        print(f"[WARN] Skipping row: missing moving file {moving}")
+        return None
+    reference_exists = exists(reference)
+    if not reference_exists and USE_REFERENCE_GRID:
+        print(f"[WARN] Skipping row: missing reference {reference}")
+        return None
+    if not transformlist:
+        print(f"[WARN] Skipping row: no transforms listed for {moving}")
+        return None
+    if output_raw:
+        output = Path(output_raw).expanduser()
+    else:
+        # Default: same folder as moving with suffix
+        output = moving.parent / f"{moving.stem}_transformed.nrrd"
+    if not dry_run:
+        output.parent.mkdir(parents=True, exist_ok=True)
+    return {
+        "moving": moving,
+        "transformlist": transformlist,
+        "reference": reference if reference_exists else None,
+        "out_dir": output.parent,
+        "out_name": output.name,
+        "fish_id": getattr(row, "fish_id", "") or moving.stem,
+        "round": getattr(row, "label", "") or "manifest",
+        "colname": getattr(row, "label", "") or "manifest"
+    }
+
+def open_manifest_writer(manifest_path):
+    """
+    Open transManifest.csv for appending; returns (file, csv.DictWriter).
+    Older manifests that predate newer columns (e.g. 'interpolator') are rewritten once with the union of columns;
+    the rewrite goes to a temp file next to the manifest and is swapped in with os.replace, so a failure keeps the old file.
+    """
+    manifest_path = Path(manifest_path)
+    fieldnames = list(MANIFEST_FIELDS)
+    write_header = not manifest_path.exists() or manifest_path.stat().st_size == 0
+    if not write_header:
+        with open(manifest_path, newline='') as f:
+            existing_cols = next(csv.reader(f), [])
+        fieldnames = existing_cols + [c for c in MANIFEST_FIELDS if c not in existing_cols]
+        if len(fieldnames) > len(existing_cols):
+            old_df = pd.read_csv(manifest_path, dtype=str, keep_default_na=False)
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{manifest_path.name}.", suffix=".tmp", dir=str(manifest_path.parent))
+            try:
+                with os.fdopen(fd, 'w', newline='') as tmp_f:
+                    old_df.reindex(columns=fieldnames).to_csv(tmp_f, index=False)
+                    tmp_f.flush()
+                    os.fsync(tmp_f.fileno())
+                os.replace(tmp_path, manifest_path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+    f = open(manifest_path, 'a', newline='')
+    writer = csv.DictWriter(f, fieldnames=fieldnames, restval='', lineterminator='\n')
+    if write_header:
+        writer.writeheader()
+    return f, writer
+
+def list_dir_names(directory):
+    """
+    Names in a directory from one scandir (empty set if it does not exist).
+    """
+    try:
+        with os.scandir(directory) as it:
+            return {e.name for e in it}
+    except (FileNotFoundError, NotADirectoryError):
+        return set()
 
 def get_owner_root(nas_root, owner):
     """
@@ -276,6 +778,7 @@ def main():
     parser.add_argument("--dry-run", action="store_true", help="Print actions without writing outputs.")
     parser.add_argument("--mode", choices=["scan", "manifest"], default="scan", help="scan: prompt NAS owner/fish and auto-discover transforms; manifest: read CSV.")
     parser.add_argument("--manifest-csv", type=str, default="", help="Path to manifest CSV; if provided, manifest mode is assumed. Default: MANIFEST_CSV_DEFAULT")
+    parser.add_argument("--interpolator", choices=INTERPOLATOR_CHOICES, default=INTERPOLATOR, help=f"ANTs interpolator for non-quantitative channels (default: {INTERPOLATOR}). Channels in QUANTITATIVE_CHANNELS use {QUANTITATIVE_INTERPOLATOR}.")
     args = parser.parse_args()
 
     force = args.force
@@ -297,16 +800,29 @@ def main():
     danin_dir.mkdir(parents=True, exist_ok=True)
     manifest_path = danin_dir / "transManifest.csv"  # append-only, one row per transformation event
     metadata_path = danin_dir / "transMetadata.csv"  # one row per fishid, TRUE/FALSE and date for each transformation
+    negative_cache_path = danin_dir / "negative_cache.json"  # transform dirs/references found missing last run
+    fish_index_path = None if dry_run else danin_dir / ".fish_index.json"  # cached fish listing per owner root
+    if not force:  # --force re-probes every transform dir/reference
+        load_negative_cache(negative_cache_path)
 
     best_rounds_map = load_best_rounds(BEST_ROUNDS_CSV)
     owner = None
     selected_fishids = []
     jobs = []
-    manifest_rows = []  # for appending to transManifest.csv (only actual transformations)
     fish_best_info = {}  # cache best_round/num_rounds per fish for metadata
+    skipped_existing = [0]  # outputs already on disk, dropped while building jobs (scan mode)
 
     if mode == "scan":
-        owner, selected_fishids = prompt_owner_and_fishid(NAS_ROOT)
+        def pending(files, aligned_dir, suffix):
+            # Cheap output check before any transform/reference lookup: one scandir per aligned dir
+            if force:
+                return files
+            done = list_dir_names(aligned_dir)
+            todo = [f for f in files if f"{f.stem}_in_{suffix}.nrrd" not in done]
+            skipped_existing[0] += len(files) - len(todo)
+            return todo
+
+        owner, selected_fishids = prompt_owner_and_fishid(NAS_ROOT, index_path=fish_index_path, refresh=force)
         for fish_id in selected_fishids:
             best_info = best_rounds_map.get(fish_id, {"best_round": 1, "num_rounds": 1, "owner": owner or ""})
             best_round = parse_round_val(best_info.get("best_round", 1), 1)
@@ -321,10 +837,11 @@ def main():
                 print(f"[DEBUG] Skipping {fish_id}: missing preprocessing or reg directory.")
                 continue
 
-            best_ref_2p = find_reference_2p(preproc_dir, fish_id)
-            best_ref_round = find_best_round_reference(preproc_dir, fish_id, best_round)
+            best_ref_2p = find_reference_2p_cached(str(preproc_dir), fish_id)
+            best_ref_round = find_best_round_reference_cached(str(preproc_dir), fish_id, best_round)
             best_affine, best_warp, stg_best = find_best_to_2p_transforms(reg_dir, fish_id, best_round)
-            best_hcr_files = find_hcr_channels(preproc_dir, fish_id, best_round, best_round)
+            best_hcr_files = pending(find_hcr_channels(preproc_dir, fish_id, best_round, best_round),
+                                     reg_dir / "01_rbest-2p" / "aligned", "2p")
             if best_hcr_files and best_affine and best_warp and best_ref_2p:
                 aligned_dir = reg_dir / stg_best / "aligned"
                 if not dry_run:
@@ -341,7 +858,7 @@ def main():
                         "colname": f"r{best_round}->2p",
                         "target_suffix": "2p"
                     })
-            else:
+            elif best_hcr_files:
                 print(f"[DEBUG] Missing best->2p prerequisites for {fish_id} (round {best_round}).")
 
             for round_num in range(1, num_rounds + 1):
@@ -351,15 +868,19 @@ def main():
                 if not hcr_files:
                     print(f"[DEBUG] No HCR channels found for {fish_id} round {round_num}.")
                     continue
+                hcr_files_rb = pending(hcr_files, reg_dir / "02_rn-rbest" / "aligned", f"r{best_round}")
+                hcr_files_rn2p = pending(hcr_files, reg_dir / "03_rn-2p" / "aligned", "2p")
+                if not (hcr_files_rb or hcr_files_rn2p):
+                    continue
 
                 affine_rb, warp_rb, stg_rb = find_round_to_best_transforms(reg_dir, fish_id, round_num, best_round)
                 if not (affine_rb and warp_rb and best_ref_round):
                     print(f"[DEBUG] Missing rn->best prerequisites for {fish_id} round {round_num}.")
                     continue
                 aligned_dir_rb = reg_dir / stg_rb / "aligned"
-                if not dry_run:
+                if not dry_run and hcr_files_rb:
                     aligned_dir_rb.mkdir(parents=True, exist_ok=True)
-                for hcr_file in hcr_files:
+                for hcr_file in hcr_files_rb:
                     jobs.append({
                         "moving": hcr_file,
                         "transformlist": [str(warp_rb), str(affine_rb)],
@@ -372,11 +893,13 @@ def main():
                         "target_suffix": f"r{best_round}"
                     })
 
+                if not hcr_files_rn2p:
+                    continue
                 if best_affine and best_warp and best_ref_2p:
                     aligned_dir_rn2p = reg_dir / "03_rn-2p" / "aligned"
                     if not dry_run:
                         aligned_dir_rn2p.mkdir(parents=True, exist_ok=True)
-                    for hcr_file in hcr_files:
+                    for hcr_file in hcr_files_rn2p:
                         jobs.append({
                             "moving": hcr_file,
                             "transformlist": [str(best_warp), str(best_affine), str(warp_rb), str(affine_rb)],
@@ -397,115 +920,244 @@ def main():
         if not manifest_csv_path.exists():
             print(f"[ERROR] Manifest CSV not found: {manifest_csv_path}")
             sys.exit(2)
-        df = pd.read_csv(manifest_csv_path)
+        # Only the documented columns, all as str (no dtype sniffing; blanks stay "" instead of NaN), stripped once
+        df = pd.read_csv(manifest_csv_path, usecols=lambda c: c in MANIFEST_INPUT_COLUMNS, dtype=str,
+                         engine="c", na_filter=False)
+        df = df.apply(lambda col: col.str.strip())
         required_cols = {"moving", "reference", "transforms"}
         missing_cols = required_cols - set(df.columns)
         if missing_cols:
             print(f"[ERROR] Manifest missing required columns: {', '.join(sorted(missing_cols))}")
             sys.exit(2)
-        for _, row in df.iterrows():
-            moving = Path(str(row["moving"])).expanduser()
-            reference = Path(str(row["reference"])).expanduser()
-            output_raw = str(row["output"]) if "output" in row else ""
-            output = None
-            transformlist = [t.strip() for t in str(row["transforms"]).split(";") if t.strip()]
-            if not moving.exists():
-                print(f"[WARN] Skipping row: missing moving file {moving}")
-                continue
-            if not reference.exists() and USE_REFERENCE_GRID:
-                print(f"[WARN] Skipping row: missing reference {reference}")
-                continue
-            if not transformlist:
-                print(f"[WARN] Skipping row: no transforms listed for {moving}")
-                continue
-            if output_raw and output_raw.lower() != "nan":
-                output = Path(output_raw).expanduser()
-            else:
-                # Default: same folder as moving with suffix
-                output = moving.parent / f"{moving.stem}_transformed.nrrd"
-            if not dry_run:
-                output.parent.mkdir(parents=True, exist_ok=True)
-            jobs.append({
-                "moving": moving,
-                "transformlist": transformlist,
-                "reference": reference if reference.exists() else None,
-                "out_dir": output.parent,
-                "out_name": output.name,
-                "fish_id": str(row.get("fish_id", moving.stem)),
-                "round": str(row.get("label", "manifest")),
-                "colname": str(row.get("label", "manifest"))
-            })
+        # Validate against one scandir per input directory instead of a stat per file on the NAS
+        input_dirs = sorted({str(Path(p).expanduser().parent) for col in ("moving", "reference") for p in df[col] if p})
+        with concurrent.futures.ThreadPoolExecutor(max_workers=IO_WORKERS) as executor:
+            listings = {d: {n.lower() for n in names} for d, names in zip(input_dirs, executor.map(list_dir_names, input_dirs))}
+            row_jobs = executor.map(functools.partial(manifest_row_to_job, dry_run=dry_run, listings=listings), df.itertuples(index=False))
+            jobs.extend(job for job in row_jobs if job is not None)
+
+    for job in jobs:
+        job["interpolator"] = channel_interpolator(job["moving"], args.interpolator)
+    # Group jobs sharing a reference so each reference is decoded once and stays hot in the small LRU
+    jobs.sort(key=lambda j: str(j.get("reference") or ""))
 
     print(f"Found {len(jobs)} files to transform (mode={mode}).")
+    if skipped_existing[0]:
+        print(f"[INFO] Skipping {skipped_existing[0]} outputs that already exist (use --force to overwrite).")
 
-    # Parallel processing setup
-    max_workers = max(1, multiprocessing.cpu_count() - 1)
-    print(f"[INFO] Using {max_workers} parallel workers.")
+    # Parallel processing setup: I/O threads read/write images, worker processes run the resampling
+    itk_threads = max(1, min(ITK_THREADS_PER_WORKER, multiprocessing.cpu_count()))
+    max_workers = max(1, multiprocessing.cpu_count() // itk_threads)
+    print(f"[INFO] Using {max_workers} transform workers x {itk_threads} ITK threads and {IO_WORKERS} I/O threads.")
 
-    def process_job(job):
-        RED = "\033[91m"
-        RESET = "\033[0m"
-        out_name = job.get("out_name") or f"{job['moving'].stem}_transformed.nrrd"
-        out_path = job["out_dir"] / out_name
-        def short_path(p):
-            try:
-                return str(Path(p).relative_to(NAS_ROOT))
-            except Exception:
-                return str(p)
-        now = datetime.datetime.now().isoformat(timespec='seconds')
-        user = getpass.getuser()
-        host = socket.gethostname()
-        if out_path.exists() and not force:
-            msg = f"{RED}{out_path.name} (already exists, use --force to overwrite){RESET}"
-            print(f"[INFO] Skipping {msg}")
-            return (job['fish_id'], job['colname'], 'skipped', '', str(out_path))
-        if dry_run:
-            print(f"[DRY-RUN] Would transform {short_path(job['moving'])} -> {short_path(out_path)}")
-            return (job['fish_id'], job['colname'], 'dry_run', '', str(out_path))
+    RED = "\033[91m"
+    RESET = "\033[0m"
+    user = getpass.getuser()
+    host = socket.gethostname()
+
+    def short_path(p):
         try:
-            moving_img = ants.image_read(str(job["moving"]))
-            reference_img = ants.image_read(str(job["reference"])) if job.get("reference") else moving_img
-            transformlist = [str(t) for t in job["transformlist"]]
-            fixed_img = reference_img if USE_REFERENCE_GRID else moving_img
-            transformed = ants.apply_transforms(
-                fixed=fixed_img,
-                moving=moving_img,
-                transformlist=transformlist,
-                interpolator=INTERPOLATOR
-            )
-            ants.image_write(transformed, str(out_path))
-            print(f"   -> saved: {short_path(out_path)}")
-            manifest_rows.append({
-                'fish_id': job.get('fish_id', ''),
-                'transformation': job.get('colname', ''),
-                'status': 'success',
-                'date': now,
-                'user': f"{user}@{host}",
-                'input': short_path(job['moving']),
-                'output': short_path(out_path),
-                'error': ''
-            })
-            return (job['fish_id'], job['colname'], 'success', '', str(out_path))
-        except Exception as e:
-            print(f"[ERROR] Failed to transform {short_path(job['moving'])} for fish {job['fish_id']} round {job['round']}: {e}")
-            traceback.print_exc()
-            manifest_rows.append({
+            return str(Path(p).relative_to(NAS_ROOT))
+        except Exception:
+            return str(p)
+
+    def record(job, out_path, status, error=''):
+        # Returns (result tuple, manifest row or None); only actual transformations go to transManifest.csv
+        manifest_row = None
+        if status in ('success', 'failed'):
+            manifest_row = {
                 'fish_id': job.get('fish_id', ''),
                 'transformation': job.get('colname', ''),
-                'status': 'failed',
-                'date': now,
+                'status': status,
+                'date': datetime.datetime.now().isoformat(timespec='seconds'),
                 'user': f"{user}@{host}",
                 'input': short_path(job['moving']),
                 'output': short_path(out_path),
-                'error': str(e)
-            })
-            return (job['fish_id'], job['colname'], 'failed', str(e), str(out_path))
+                'error': error,
+                'interpolator': job['interpolator']
+            }
+        return (job['fish_id'], job['colname'], status, error, str(out_path)), manifest_row
+
+    compose_dir = None
+    compose_futures = {}  # (reference, chain) -> future of the composed field path (or None)
+    compose_lock = threading.Lock()
+    chain_uses = collections.Counter()  # runnable jobs per (reference, chain); filled before any job starts
+
+    def compose_key(job):
+        if not (COMPOSE_TRANSFORMS and USE_REFERENCE_GRID and job.get("reference") and len(job["transformlist"]) > 1):
+            return None
+        return (str(job["reference"]), tuple(str(t) for t in job["transformlist"]))
+
+    def job_compose_future(job, fixed_geom):
+        # Channels of one (fish, round) share reference + chain: compose the chain once in the worker pool and
+        # reuse the field. None if not worth composing (a single channel pays compose + apply for nothing).
+        key = compose_key(job)
+        if key is None or compose_dir is None or chain_uses[key] < 2:
+            return None
+        with compose_lock:
+            fut = compose_futures.get(key)
+            if fut is None:
+                prefix = os.path.join(compose_dir, f"chain{len(compose_futures):04d}_")
+                fut = compose_futures[key] = cpu_pool.submit(compose_transform_chain, fixed_geom, list(key[1]), prefix)
+        return fut
+
+    def resolved_transformlist(job, compose_fut):
+        # The composed field if composing succeeded, else the original chain
+        transformlist = [str(t) for t in job["transformlist"]]
+        if compose_fut is None:
+            return transformlist
+        exc = compose_fut.exception()
+        composed_path = None if exc is not None else compose_fut.result()
+        if composed_path is None or not os.path.exists(composed_path):
+            print(f"[WARN] Composing the chain for {short_path(job['moving'])} failed ({exc or 'no output'}); applying it uncomposed.")
+            return transformlist
+        return [composed_path]
+
+    def read_stage(job):
+        # I/O stage: decode moving (+ cached reference) and hand the voxels over via shared memory
+        header_error = probe_nrrd_header(job["moving"])
+        if header_error:
+            raise ValueError(header_error)
+        import ants  # deferred: ITK start-up is only paid once a job actually runs (not for --help / --dry-run)
+        moving_img = ants.image_read(str(job["moving"]))
+        # The reference only supplies the output grid; don't decode it when the moving grid is kept
+        fixed_img = read_image_cached(job["reference"]) if USE_REFERENCE_GRID and job.get("reference") else moving_img
+        moving_shm, moving_desc = image_to_shared(moving_img)
+        # Only the reference grid is needed downstream, not its voxels
+        fixed_geom = None if fixed_img is moving_img else image_geometry(fixed_img)
+        compose_fut = job_compose_future(job, fixed_geom) if fixed_geom is not None else None
+        return [moving_shm], moving_desc, fixed_geom, compose_fut
+
+    def write_stage(result_desc, out_path):
+        # I/O stage: write the transformed voxels straight from shared memory
+        try:
+            write_shared(result_desc, out_path)
+        finally:
+            unlink_shared(result_desc["shm"])
+        print(f"   -> saved: {short_path(out_path)}")
+
+    if COMPOSE_TRANSFORMS and not dry_run:
+        compose_dir = tempfile.mkdtemp(prefix="applyTransform_composed_")
 
-    # Run jobs in parallel
     results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for res in tqdm(executor.map(process_job, jobs), total=len(jobs), desc="Transforming HCR channels", unit="file"):
-            results.append(res)
+    manifest_fh = manifest_writer = None
+    manifest_count = 0
+    done_futures = [concurrent.futures.Future() for _ in jobs]
+    # Never fewer slots than 2x the workers: a decoded job is always queued behind every busy worker
+    pipeline_depth = max(PIPELINE_DEPTH, 2 * max_workers)
+    slots = threading.BoundedSemaphore(pipeline_depth)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=IO_WORKERS) as read_pool, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"),
+                                                initializer=init_transform_worker, initargs=(itk_threads,)) as cpu_pool, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=IO_WORKERS) as write_pool:
+
+        def settle_job(job, done):
+            # Resolve skipped / dry-run jobs immediately; returns the output path if the job must run
+            out_name = job.get("out_name") or f"{Path(job['moving']).stem}_transformed.nrrd"
+            out_path = job["out_dir"] / out_name
+            if out_path.exists() and not force:
+                msg = f"{RED}{out_path.name} (already exists, use --force to overwrite){RESET}"
+                print(f"[INFO] Skipping {msg}")
+                done.set_result(record(job, out_path, 'skipped'))
+                return None
+            if dry_run:
+                print(f"[DRY-RUN] Would transform {short_path(job['moving'])} -> {short_path(out_path)}")
+                done.set_result(record(job, out_path, 'dry_run'))
+                return None
+            return out_path
+
+        def start_job(job, done, out_path):
+            slots.acquire()  # back-pressure: bounds the number of decoded volumes in flight
+
+            def finish(exc=None):
+                if exc is None:
+                    done.set_result(record(job, out_path, 'success'))
+                else:
+                    print(f"[ERROR] Failed to transform {short_path(job['moving'])} for fish {job['fish_id']} round {job['round']}: {exc}")
+                    traceback.print_exception(type(exc), exc, exc.__traceback__)
+                    done.set_result(record(job, out_path, 'failed', str(exc)))
+                slots.release()
+
+            def after_write(fut):
+                finish(fut.exception())
+
+            def after_compute(fut, shms):
+                for shm in shms:
+                    shm.close()
+                    shm.unlink()
+                if fut.exception() is not None:
+                    finish(fut.exception())
+                    return
+                write_pool.submit(write_stage, fut.result(), out_path).add_done_callback(after_write)
+
+            def submit_transform(shms, moving_desc, fixed_geom, compose_fut):
+                try:
+                    transformlist = resolved_transformlist(job, compose_fut)
+                    cpu_fut = cpu_pool.submit(transform_shared, moving_desc, fixed_geom, transformlist, job["interpolator"])
+                except Exception as e:
+                    for shm in shms:
+                        shm.close()
+                        shm.unlink()
+                    finish(e)
+                    return
+                cpu_fut.add_done_callback(lambda f: after_compute(f, shms))
+
+            def after_read(fut):
+                if fut.exception() is not None:
+                    finish(fut.exception())
+                    return
+                shms, moving_desc, fixed_geom, compose_fut = fut.result()
+                if compose_fut is None:
+                    submit_transform(shms, moving_desc, fixed_geom, None)
+                    return
+                # Wait for the shared compose without holding an I/O thread; the submit is handed to a
+                # thread pool so it never runs inside the process pool's own callback thread
+                compose_fut.add_done_callback(
+                    lambda f: read_pool.submit(submit_transform, shms, moving_desc, fixed_geom, f))
+
+            read_pool.submit(read_stage, job).add_done_callback(after_read)
+
+        def feed():
+            # Settle cheap jobs first so they never queue behind the back-pressure semaphore
+            runnable = []
+            for job, done in zip(jobs, done_futures):
+                try:
+                    out_path = settle_job(job, done)
+                except Exception as e:
+                    done.set_exception(e)
+                    continue
+                if out_path is not None:
+                    runnable.append((job, done, out_path))
+            chain_uses.update(filter(None, (compose_key(job) for job, _, _ in runnable)))
+            for job, done, out_path in runnable:
+                try:
+                    start_job(job, done, out_path)
+                except Exception as e:
+                    if not done.done():
+                        done.set_exception(e)
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        # as_completed: progress and failures surface as soon as any job finishes, not in submission order
+        for fut in tqdm(concurrent.futures.as_completed(done_futures), total=len(jobs), desc="Transforming HCR channels", unit="file"):
+            result, manifest_row = fut.result()
+            results.append(result)
+            if manifest_row:
+                # Stream each finished transformation so the manifest survives a crash mid-run
+                if manifest_writer is None:
+                    manifest_fh, manifest_writer = open_manifest_writer(manifest_path)
+                manifest_writer.writerow(manifest_row)
+                manifest_fh.flush()
+                manifest_count += 1
+        feeder.join()
+
+    if manifest_fh is not None:
+        manifest_fh.close()
+        print(f"[INFO] Appended {manifest_count} rows to {manifest_path}")
+
+    if compose_dir:
+        shutil.rmtree(compose_dir, ignore_errors=True)
 
     if mode == "scan":
         col_order = ['best_round', 'num_rounds', 'best_to_2p', 'best_to_2p_date']
@@ -545,8 +1197,7 @@ def main():
 
                 expected_channels = list_round_channels(preproc_dir, fish_id, round_num, best_round)
 
-                # rn->best (best round uses raw channels as TRUE)
-                statuses_best = []
+                # rn->best (best round uses raw channels as TRUE); per-round TRUE/FALSE roll-ups are computed on the frame
                 latest_best_mtime = None
                 if round_num == best_round:
                     for ch in expected_channels:
@@ -556,10 +1207,7 @@ def main():
                         ensure_col(col_status)
                         row[col_id] = ch["gene"]
                         row[col_status] = 'TRUE'
-                        statuses_best.append('TRUE')
                         latest_best_mtime = max(latest_best_mtime, ch["mtime"]) if latest_best_mtime else ch["mtime"]
-                    row[to_best_col] = 'TRUE' if statuses_best else ''
-                    row[to_best_date_col] = datetime.datetime.fromtimestamp(latest_best_mtime).isoformat(timespec='seconds') if latest_best_mtime else ''
                 else:
                     aligned_dir = reg_dir / "02_rn-rbest" / "aligned"
                     for ch in expected_channels:
@@ -571,19 +1219,14 @@ def main():
                         if out_file:
                             row[col_id] = gene_out or ch["gene"]
                             row[col_status] = 'TRUE'
-                            statuses_best.append('TRUE')
                             latest_best_mtime = max(latest_best_mtime, mtime) if latest_best_mtime else mtime
                         else:
                             row[col_id] = row.get(col_id, ch["gene"])
                             row[col_status] = 'FALSE'
-                            statuses_best.append('FALSE')
-                    if statuses_best:
-                        row[to_best_col] = 'TRUE' if any(s == 'TRUE' for s in statuses_best) else 'FALSE'
-                        row[to_best_date_col] = datetime.datetime.fromtimestamp(latest_best_mtime).isoformat(timespec='seconds') if latest_best_mtime else ''
+                row[to_best_date_col] = datetime.datetime.fromtimestamp(latest_best_mtime).isoformat(timespec='seconds') if latest_best_mtime else ''
 
                 # to 2P (best round uses 01_rbest-2p, others 03_rn-2p)
                 aligned_dir_2p = reg_dir / ("01_rbest-2p" if round_num == best_round else "03_rn-2p") / "aligned"
-                statuses_2p = []
                 latest_2p_mtime = None
                 for ch in expected_channels:
                     col_id = f"{round_label}_2p_ch{ch['channel']}_id"
@@ -594,38 +1237,43 @@ def main():
                     if out_file:
                         row[col_id] = gene_out or ch["gene"]
                         row[col_status] = 'TRUE'
-                        statuses_2p.append('TRUE')
                         latest_2p_mtime = max(latest_2p_mtime, mtime) if latest_2p_mtime else mtime
                     else:
                         row[col_id] = row.get(col_id, ch["gene"])
                         row[col_status] = 'FALSE'
-                        statuses_2p.append('FALSE')
-                if statuses_2p:
-                    row[to_2p_col] = 'TRUE' if any(s == 'TRUE' for s in statuses_2p) else 'FALSE'
-                    row[to_2p_date_col] = datetime.datetime.fromtimestamp(latest_2p_mtime).isoformat(timespec='seconds') if latest_2p_mtime else ''
-                if round_num == best_round:
-                    if statuses_2p:
-                        row["best_to_2p"] = row[to_2p_col]
-                        row["best_to_2p_date"] = row[to_2p_date_col]
+                row[to_2p_date_col] = datetime.datetime.fromtimestamp(latest_2p_mtime).isoformat(timespec='seconds') if latest_2p_mtime else ''
 
             meta_rows[fish_id] = row
 
         if meta_rows:
-            meta_df = pd.DataFrame.from_dict(meta_rows, orient="index")
-            meta_df = meta_df.reindex(columns=col_order)
+            # Single construction from the per-fish dicts; columns= fixes the order without a reindex copy
+            meta_df = pd.DataFrame.from_dict(meta_rows, orient="index", columns=col_order).fillna('')
             meta_df.index.name = 'fish_id'
-            meta_df.fillna('', inplace=True)
+            # rN_to_best / rN_to_2p: TRUE if any channel is TRUE, FALSE if channels exist but none is, else ''
+            for col in col_order:
+                if col == "best_to_2p" or not col.endswith(("_to_best", "_to_2p")):
+                    continue
+                round_label, target = col.split("_to_")
+                status_cols = [c for c in col_order if c.startswith(f"{round_label}_{target}_ch") and c.endswith("_status")]
+                if not status_cols:
+                    continue
+                statuses = meta_df[status_cols]
+                meta_df[col] = np.where((statuses == 'TRUE').any(axis=1), 'TRUE',
+                                        np.where((statuses != '').any(axis=1), 'FALSE', ''))
+            # best_to_2p mirrors each fish's best-round to_2p columns
+            for best_label in meta_df["best_round"].unique():
+                mask = meta_df["best_round"] == best_label
+                if f"{best_label}_to_2p" in meta_df.columns:
+                    meta_df.loc[mask, "best_to_2p"] = meta_df.loc[mask, f"{best_label}_to_2p"]
+                    meta_df.loc[mask, "best_to_2p_date"] = meta_df.loc[mask, f"{best_label}_to_2p_date"]
             meta_df.to_csv(metadata_path)
             print(f"[INFO] Metadata written to {metadata_path}")
         else:
             print("[INFO] No metadata rows to write.")
 
-    # Append to transManifest.csv (append-only, one row per transformation event, only for actual transformations)
-    manifest_df = pd.DataFrame(manifest_rows)
-    if not manifest_df.empty:
-        header = not manifest_path.exists()
-        manifest_df.to_csv(manifest_path, mode='a', header=header, index=False)
-        print(f"[INFO] Appended {len(manifest_df)} rows to {manifest_path}")
+    # Remember this run's missing transform dirs/references for the next invocation
+    if not dry_run:
+        save_negative_cache(negative_cache_path)
 
     print("All done.")
 
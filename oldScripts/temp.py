@@ -8,9 +8,13 @@ df = pd.read_csv("/Users/ddharmap/Library/CloudStorage/OneDrive-UniversitédeLau
 # Check column names
 print(df.head())
 
-# Plot ΔF/F vs. frame
+# Plot ΔF/F vs. frame (long traces are strided for display; the line is rasterized so exports stay small)
+MAX_PLOT_POINTS = 50_000
+step = max(1, len(df) // MAX_PLOT_POINTS)
+frames = df["Frame"].to_numpy()[::step]
+dff = df["∆F/F"].to_numpy()[::step]
 plt.figure(figsize=(10, 5))
-plt.plot(df["Frame"], df["∆F/F"], linewidth=1, color="black")
+plt.plot(frames, dff, linewidth=1, color="black", rasterized=True)
 
 # Labels
 plt.xlabel("Frame")
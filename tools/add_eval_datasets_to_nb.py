@@ -25,47 +25,105 @@ print(f'Frozen evaluation pairs: {len(eval_pairs)}')
 
 PRECOMP_CELL = """
 # --- Precompute centroids per dataset (confocal in 2P space) ---
+import os
 import numpy as np
 import pandas as pd
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import tifffile as tiff
 
 # Helper: generic label loader
 def _load_labels_any(path: str):
     p = str(path)
     if p.endswith(('.tif', '.tiff')):
-        return tiff.imread(p)
+        try:
+            return tiff.memmap(p, mode='r')  # read-only map; falls back for compressed/tiled files
+        except (ValueError, OSError):
+            return tiff.imread(p)
     if p.endswith('.npy'):
         return np.load(p)
     if p.endswith('.npz'):
         obj = np.load(p, allow_pickle=True)
-        for k in ('masks','labels','arr_0'):
-            if k in obj: return obj[k]
+        keys = set(obj.files)  # archive member names, read once
+        pick = next((k for k in ('masks','labels','arr_0') if k in keys), None)
+        if pick is not None: return obj[pick]
     raise RuntimeError(f'Unsupported label format: {p}')
 
-# Build 2P coordinate LUT once
+# Label stacks larger than this are reduced slab-by-slab (bounded scratch memory)
+TILED_CENTROIDS_BYTES = 2e9
+
+def _tiled_centroids(arr, tile_z=128):
+    # Exact centroids from Z-slabs: per-slab centroids weighted by voxel count, merged per label
+    from skimage.measure import regionprops_table
+    parts = []
+    for z0 in range(0, arr.shape[0], tile_z):
+        slab = np.asarray(arr[z0:z0+tile_z])
+        props = pd.DataFrame(regionprops_table(slab, properties=('label', 'area', 'centroid')))
+        if props.empty:
+            continue
+        props = props.rename(columns={'centroid-0': 'z', 'centroid-1': 'y', 'centroid-2': 'x'})
+        props['z'] += z0
+        parts.append(props)
+    if not parts:
+        return pd.DataFrame(columns=['label', 'z', 'y', 'x'])
+    df = pd.concat(parts, ignore_index=True)
+    df = df[df['label'] != 0]
+    for c in ('z', 'y', 'x'):
+        df[c] = df[c] * df['area']
+    g = df.groupby('label', sort=True)[['z', 'y', 'x', 'area']].sum()
+    for c in ('z', 'y', 'x'):
+        g[c] = g[c] / g['area']
+    return g.reset_index()[['label', 'z', 'y', 'x']]
+
+# Dense label -> coordinate LUT (row = label id, NaN where the label is absent) for vectorized gathers
+def _coords_lut(labels, P):
+    labels = np.asarray(labels, dtype=np.int64)
+    lut = np.full((int(labels.max()) + 1 if labels.size else 1, 3), np.nan)
+    lut[labels] = np.asarray(P, dtype=np.float64)
+    return lut
+
+def _gather_coords(lut, ids):
+    ids = np.asarray(ids, dtype=np.int64)
+    out = np.full((ids.size, 3), np.nan)
+    ok = (ids >= 0) & (ids < lut.shape[0])
+    out[ok] = lut[ids[ok]]
+    return out
+
+# Build 2P coordinate LUT once (module-level; reused by the compare/viewer cells)
 assert 'df_2p' in globals() and 'P_2p_um' in globals(), 'Need 2P centroids and coords.'
-_twoP_lut = dict(zip(df_2p['label'].to_numpy(), P_2p_um))
+_twoP_lut_arr = _coords_lut(df_2p['label'].to_numpy(), P_2p_um)
 
 # Cache per dataset
 EVAL_CACHE = {}
-for key, meta in EVAL_DATASETS.items():
+# Per-dataset load + centroids (runs in worker threads; touches no shared state)
+def _prep(key, meta):
     path = meta.get('conf_labels_2p_path')
     if not path or not Path(path).exists():
-        print(f"[WARN] Skipping '{key}' — missing file: {path}")
-        continue
+        return key, None
     arr = _load_labels_any(path)
-    df_conf_ds = compute_centroids(arr)
+    df_conf_ds = _tiled_centroids(arr) if arr.nbytes > TILED_CENTROIDS_BYTES else compute_centroids(arr)
     P_conf_ds  = idx_to_um(df_conf_ds, VOX_2P)  # already in 2P grid
-    conf_lut   = dict(zip(df_conf_ds['label'].to_numpy(), P_conf_ds))
-    EVAL_CACHE[key] = {
+    return key, {
         'name': meta.get('name', key),
         'conf_arr': arr,
+        'src_path': str(path),                    # identity of the on-disk stack (viewer mesh cache key)
+        'src_mtime': os.path.getmtime(path),
         'df_conf': df_conf_ds,
         'P_conf_um': P_conf_ds,
-        'conf_lut': conf_lut,
+        'conf_lut_arr': _coords_lut(df_conf_ds['label'].to_numpy(), P_conf_ds),
     }
 
+# Disk reads and regionprops release the GIL, so threads overlap them
+_n_workers = max(1, min(len(EVAL_DATASETS), (os.cpu_count() or 2) // 2))
+with ThreadPoolExecutor(max_workers=_n_workers) as _ex:
+    _futs = [_ex.submit(_prep, key, meta) for key, meta in EVAL_DATASETS.items()]
+    for _f in _futs:  # submission order keeps EVAL_CACHE ordered like EVAL_DATASETS
+        key, entry = _f.result()
+        if entry is None:
+            print(f"[WARN] Skipping '{key}' — missing file: {EVAL_DATASETS[key].get('conf_labels_2p_path')}")
+            continue
+        EVAL_CACHE[key] = entry
+
 print('Eval datasets cached:', [f"{k}({v['name']})" for k,v in EVAL_CACHE.items()])
 """.strip("\n")
 
@@ -73,32 +131,32 @@ print('Eval datasets cached:', [f"{k}({v['name']})" for k,v in EVAL_CACHE.items(
 COMPARE_CELL = """
 # --- Comparative summary across datasets (frozen eval_pairs) ---
 import numpy as np, pandas as pd
-
-def _eval_distances_for_pairs(conf_lut: dict, twoP_lut: dict, pairs_df: pd.DataFrame, drop_missing=True):
-    ds = []
-    miss = 0
-    for _, r in pairs_df.iterrows():
-        a = conf_lut.get(int(r['conf_label']))
-        b = twoP_lut.get(int(r['twoP_label']))
-        if a is None or b is None:
-            miss += 1
-            if not drop_missing:
-                ds.append(np.nan)
-            continue
-        dz, dy, dx = a[0]-b[0], a[1]-b[1], a[2]-b[2]
-        ds.append(float(np.sqrt(dz*dz + dy*dy + dx*dx)))
-    arr = np.asarray(ds, dtype=float)
+try:
+    from IPython.display import display as _display
+except ImportError:  # plain-script run: fall back to a text table
+    _display = lambda df: print(df.to_string(index=False))
+
+def _eval_distances_for_pairs(conf_lut_arr: np.ndarray, twoP_lut_arr: np.ndarray, pairs_df: pd.DataFrame, drop_missing=True):
+    # Gather both endpoints from the dense LUTs (see _coords_lut) and take all distances in one pass
+    A = _gather_coords(conf_lut_arr, pairs_df['conf_label'].to_numpy(np.int64))
+    B = _gather_coords(twoP_lut_arr, pairs_df['twoP_label'].to_numpy(np.int64))
+    missing = np.isnan(A).any(1) | np.isnan(B).any(1)
+    arr = np.sqrt(((A - B) ** 2).sum(1))
     if drop_missing:
-        arr = arr[np.isfinite(arr)]
-    return arr, miss
+        arr = arr[~missing]
+    return arr, int(missing.sum())
 
 assert 'EVAL_CACHE' in globals() and 'eval_pairs' in globals(), 'Run precompute + freeze cells first.'
-_twoP_lut = dict(zip(df_2p['label'].to_numpy(), P_2p_um))
+if '_twoP_lut_arr' not in globals():
+    _twoP_lut_arr = _coords_lut(df_2p['label'].to_numpy(), P_2p_um)
 
 rows = []
-_all_tidy = []
+_all_dists, _all_names = [], []
 for key, payload in EVAL_CACHE.items():
-    dists, dropped = _eval_distances_for_pairs(payload['conf_lut'], _twoP_lut, eval_pairs, drop_missing=True)
+    conf_lut_arr = payload.get('conf_lut_arr')
+    if conf_lut_arr is None:  # entries added by later cells carry no LUT yet
+        conf_lut_arr = payload['conf_lut_arr'] = _coords_lut(payload['df_conf']['label'].to_numpy(), payload['P_conf_um'])
+    dists, dropped = _eval_distances_for_pairs(conf_lut_arr, _twoP_lut_arr, eval_pairs, drop_missing=True)
     stats = {
         'dataset': payload['name'],
         'n': int(dists.size),
@@ -109,24 +167,39 @@ for key, payload in EVAL_CACHE.items():
         'dropped_pairs': int(dropped),
     }
     rows.append(stats)
-    _all_tidy += [{'dataset': payload['name'], 'distance_um': float(x)} for x in dists]
+    _all_dists.append(dists.astype(float, copy=False))
+    _all_names.append(payload['name'])
 
 compare_df = pd.DataFrame(rows).sort_values('dataset')
 print('Comparative summary (final 1–1 good, frozen pairs):')
-try:
-    display(compare_df)
-except Exception:
-    print(compare_df.to_string(index=False))
+_display(compare_df)
 
-dist_by_dataset = pd.DataFrame(_all_tidy)
+# Tidy distances built column-wise: one concatenate + one repeat, no per-dataset frames
+dist_by_dataset = pd.DataFrame({
+    'dataset': np.repeat(np.asarray(_all_names, dtype=object), [d.size for d in _all_dists]),
+    'distance_um': np.concatenate(_all_dists) if _all_dists else np.empty(0),
+})
 """.strip("\n")
 
 
 VIEWER_CELL = """
 # --- 3D viewer: switch datasets (confocal) + fixed 2P background ---
+import hashlib
 import numpy as np
 import plotly.graph_objects as go
+from pathlib import Path
+from scipy.ndimage import find_objects
 from skimage.measure import marching_cubes
+# Optional fast paths: GPU marching cubes (torchmcubes) and mesh decimation (open3d)
+try:
+    import torch
+    from torchmcubes import marching_cubes as _mc_gpu
+except ImportError:
+    torch = _mc_gpu = None
+try:
+    import open3d as o3d
+except ImportError:
+    o3d = None
 
 assert 'EVAL_CACHE' in globals() and len(EVAL_CACHE) > 0, 'Run precompute datasets cell.'
 
@@ -136,17 +209,69 @@ TWO_P_COLOR = '#33a6ff' # 2P (azure)
 PAIR_LINE_COLOR = 'red'
 PAIR_LINE_WIDTH = 5
 OPACITY = 0.10
-STEP_SIZE = 1
+STEP_SIZE = 1                # minimum marching-cubes step; grows automatically for large stacks
+MESH_MAX_VOXELS = 5e7        # above this voxel count the step grows so meshing cost stays roughly constant
+MESH_MAX_FACES = 200_000     # decimate larger meshes (needs open3d) — Plotly gets sluggish beyond this
+MESH_CACHE_DIR = Path.home() / '.cache' / 'antsqc'  # meshes of on-disk datasets, keyed by path + mtime + settings
 
 # Voxel spacing (µm)
 dz = float(VOX_2P.get('dz', 1.0))
 dy = float(VOX_2P.get('dy', 1.0))
 dx = float(VOX_2P.get('dx', 1.0))
 
+def _fast_mesh(mask, spacing):
+    # Surface mesh of a boolean mask: verts (z, y, x) in µm and faces, sized for Plotly
+    if _mc_gpu is not None and torch.cuda.is_available():
+        v, f = _mc_gpu(torch.from_numpy(mask.astype(np.float32)).cuda(), 0.5)
+        v = v.cpu().numpy()[:, ::-1] * np.asarray(spacing, dtype=np.float32)  # torchmcubes returns (x, y, z)
+        f = f.cpu().numpy()
+    else:
+        step = max(STEP_SIZE, int(round((mask.size / MESH_MAX_VOXELS) ** (1 / 3))))
+        v, f, _, _ = marching_cubes(np.asarray(mask, dtype=np.uint8), level=0.5, spacing=spacing, step_size=step)
+    if o3d is not None and len(f) > MESH_MAX_FACES:
+        m = o3d.geometry.TriangleMesh(o3d.utility.Vector3dVector(np.ascontiguousarray(v, dtype=np.float64)),
+                                      o3d.utility.Vector3iVector(np.ascontiguousarray(f, dtype=np.int32)))
+        m = m.simplify_quadric_decimation(target_number_of_triangles=MESH_MAX_FACES)
+        v, f = np.asarray(m.vertices), np.asarray(m.triangles)
+    return v, f
+
+def _mesh_backend():
+    # Code paths _fast_mesh takes here (part of the mesh cache key): surface extraction + decimation
+    mc = 'torchmcubes' if _mc_gpu is not None and torch.cuda.is_available() else 'skimage'
+    return f"{mc}+{'open3d-quadric' if o3d is not None else 'no-decimation'}"
+
+def _foreground_mesh(labels, spacing):
+    # Threshold once straight into uint8 (the marching-cubes input), take the foreground bbox from it,
+    # and mesh only that crop (1-voxel pad keeps the surface closed)
+    mask = np.empty(labels.shape, dtype=np.uint8)
+    np.greater(labels, 0, out=mask, casting='unsafe')
+    objs = find_objects(mask)
+    if not objs or objs[0] is None:
+        return np.empty((0, 3)), np.empty((0, 3), dtype=np.int64)
+    crop = tuple(slice(max(s.start - 1, 0), min(s.stop + 1, n)) for s, n in zip(objs[0], mask.shape))
+    v, f = _fast_mesh(mask[crop], spacing)
+    v = v + np.asarray([s.start for s in crop], dtype=v.dtype) * np.asarray(spacing, dtype=v.dtype)
+    return v, f
+
+def _cached_mesh(payload, spacing):
+    # Confocal mesh for a dataset; stacks loaded from disk reuse a cached mesh while the file is unchanged
+    src = payload.get('src_path')
+    cache_path = None
+    if src:
+        ident = f"{src}|{payload.get('src_mtime')}|{spacing}|{_mesh_backend()}|{STEP_SIZE},{MESH_MAX_VOXELS},{MESH_MAX_FACES}|crop"
+        cache_path = MESH_CACHE_DIR / f"mesh_{hashlib.blake2b(ident.encode(), digest_size=16).hexdigest()}.npz"
+        if cache_path.exists():
+            with np.load(cache_path) as z:
+                return z['v'], z['f']
+    v, f = _foreground_mesh(payload['conf_arr'], spacing)
+    if cache_path is not None and len(f):
+        MESH_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        np.savez(cache_path, v=v, f=f)
+    return v, f
+
 # Build 2P background mesh once
-mask_2p = (masks_2p > 0)
-if np.any(mask_2p):
-    vT, fT, _, _ = marching_cubes(mask_2p.astype(np.uint8), level=0.5, spacing=(dz, dy, dx), step_size=STEP_SIZE)
+vT, fT = _foreground_mesh(masks_2p, (dz, dy, dx))
+if len(fT):
     iT, jT, kT = fT.T.astype(np.int32, copy=False)
     zT, yT, xT = vT[:, 0], vT[:, 1], vT[:, 2]
     t_twoP = go.Mesh3d(x=xT, y=yT, z=zT, i=iT, j=jT, k=kT, name='2P mask', color=TWO_P_COLOR, opacity=OPACITY, lighting=dict(ambient=0.5))
@@ -161,15 +286,16 @@ pts_twoP = go.Scatter3d(x=X2, y=Y2, z=Z2, mode='markers', name='2P centroids', m
 all_traces = [t_twoP, pts_twoP]
 trace_groups = {}
 
-# LUTs
-_twoP_lut = dict(zip(df_2p['label'].to_numpy(), P_2p_um))
+# LUTs (dense, see _coords_lut in the precompute cell; the 2P one is cached there)
+if '_twoP_lut_arr' not in globals():
+    _twoP_lut_arr = _coords_lut(df_2p['label'].to_numpy(), P_2p_um)
+_pair_conf_ids = eval_pairs['conf_label'].to_numpy(np.int64)
+_pair_twoP_ids = eval_pairs['twoP_label'].to_numpy(np.int64)
 
 for key, payload in EVAL_CACHE.items():
     name = payload['name']
-    arr = payload['conf_arr']
-    conf_mask = (arr > 0)
-    if np.any(conf_mask):
-        vC, fC, _, _ = marching_cubes(conf_mask.astype(np.uint8), level=0.5, spacing=(dz, dy, dx), step_size=STEP_SIZE)
+    vC, fC = _cached_mesh(payload, (dz, dy, dx))
+    if len(fC):
         iC, jC, kC = fC.T.astype(np.int32, copy=False)
         zC, yC, xC = vC[:, 0], vC[:, 1], vC[:, 2]
         t_conf = go.Mesh3d(x=xC, y=yC, z=zC, i=iC, j=jC, k=kC, name=f'{name} conf mask', color=CONF_COLOR, opacity=OPACITY, lighting=dict(ambient=0.5))
@@ -180,17 +306,17 @@ for key, payload in EVAL_CACHE.items():
     Zc, Yc, Xc = P_conf[:,0], P_conf[:,1], P_conf[:,2]
     pts_conf = go.Scatter3d(x=Xc, y=Yc, z=Zc, mode='markers', name=f'{name} conf centroids', marker=dict(size=2, color=CONF_COLOR), showlegend=True)
 
-    # Pair lines using frozen eval_pairs
-    xl, yl, zl = [], [], []
-    conf_lut = payload['conf_lut']
-    for _, r in eval_pairs.iterrows():
-        a = conf_lut.get(int(r['conf_label']))
-        b = _twoP_lut.get(int(r['twoP_label']))
-        if a is None or b is None:
-            continue
-        x0, y0, z0 = a[2], a[1], a[0]
-        x1, y1, z1 = b[2], b[1], b[0]
-        xl += [x0, x1, None]; yl += [y0, y1, None]; zl += [z0, z1, None]
+    # Pair lines using frozen eval_pairs: rows of (conf, 2P, NaN) — Plotly breaks lines at NaN
+    conf_lut_arr = payload.get('conf_lut_arr')
+    if conf_lut_arr is None:
+        conf_lut_arr = payload['conf_lut_arr'] = _coords_lut(payload['df_conf']['label'].to_numpy(), P_conf)
+    A = _gather_coords(conf_lut_arr, _pair_conf_ids)
+    B = _gather_coords(_twoP_lut_arr, _pair_twoP_ids)
+    ok = ~(np.isnan(A).any(1) | np.isnan(B).any(1))
+    seg = np.full((3 * int(ok.sum()), 3), np.nan)
+    seg[0::3] = A[ok][:, ::-1]  # zyx -> xyz
+    seg[1::3] = B[ok][:, ::-1]
+    xl, yl, zl = seg[:, 0], seg[:, 1], seg[:, 2]
     pair_lines = go.Scatter3d(x=xl, y=yl, z=zl, mode='lines', name=f'{name} pairs', line=dict(color=PAIR_LINE_COLOR, width=PAIR_LINE_WIDTH), hoverinfo='skip', showlegend=True)
 
     idx0 = len(all_traces)
@@ -0,0 +1,128 @@
+"""
+Sanity checks for helper functions defined inside the notebooks.
+
+The named top-level definitions are pulled out of the notebook code cells (the cells themselves are
+not run) and compared against reference implementations. Needs numpy/scipy/scikit-image.
+
+    python tools/check_nb_helpers.py
+"""
+import ast
+import json
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+NB_2PF = ROOT / 'notebooks' / '2PF_to_HCR.ipynb'
+NB_QC = ROOT / 'notebooks' / 'antsQC.ipynb'
+
+
+def load_defs(nb_path: Path, names, ns=None) -> dict:
+    """Exec the top-level functions/assignments called `names` from nb_path's code cells into ns (in `names` order)."""
+    ns = {} if ns is None else ns
+    found = {}
+    for c in json.loads(nb_path.read_text()).get('cells', []):
+        if c.get('cell_type') != 'code':
+            continue
+        src = ''.join(c.get('source', []))
+        try:
+            tree = ast.parse(src)
+        except SyntaxError:  # cells with IPython magics
+            continue
+        lines = src.splitlines(True)
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+                key = node.name
+            elif isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+                key = node.targets[0].id
+            else:
+                continue
+            if key in names and key not in found:
+                start = min([node.lineno] + [d.lineno for d in getattr(node, 'decorator_list', [])])
+                found[key] = ''.join(lines[start - 1:node.end_lineno])
+    missing = [n for n in names if n not in found]
+    if missing:
+        raise SystemExit(f'{nb_path.name}: definitions not found: {", ".join(missing)}')
+    for n in names:
+        exec(found[n], ns)
+    return ns
+
+
+def check_corrcoef_img():
+    ns = load_defs(NB_2PF, ['corrcoef_img'], {'np': np})
+    rng = np.random.default_rng(0)
+    # Raw 2P-like frames: large offset, unit noise, r ~ 0.707
+    n1, n2 = rng.normal(0, 1, (2, 512, 512))
+    a = (1000 + n1).astype(np.float32)
+    b = (1000 + (n1 + n2) / np.sqrt(2)).astype(np.float32)
+    for x, y in ((a, b), (a, a), (a.astype(np.uint16), b.astype(np.uint16))):
+        ref = np.corrcoef(x.ravel().astype(np.float64), y.ravel().astype(np.float64))[0, 1]
+        got = ns['corrcoef_img'](x, y)
+        assert abs(got - ref) < 1e-6, f'corrcoef_img {got:.6f} vs np.corrcoef {ref:.6f}'
+
+
+def check_parse_kv():
+    import re
+    ns = load_defs(NB_2PF, ['_KV_RE', '_parse_kv'], {'re': re})
+    parse = ns['_parse_kv']
+    assert parse('a=1\runit=um\rpixelWidth=0.3') == {'a': '1', 'unit': 'um', 'pixelWidth': '0.3'}  # CR-only
+    assert parse('a = 1\r\nb=x=y\n c=\n') == {'a': '1', 'b': 'x=y', 'c': ''}  # CRLF, '=' in value, empty value
+    assert parse('no pairs here') == {}
+
+
+def _hungarian_defs():
+    from scipy.optimize import linear_sum_assignment
+    from scipy.spatial import cKDTree
+    names = ['_pairwise_dist_f32', '_hungarian_dense', 'hungarian_match']
+    yield NB_QC.name, load_defs(NB_QC, names, {'np': np, 'cKDTree': cKDTree, 'linear_sum_assignment': linear_sum_assignment})
+    yield NB_2PF.name, load_defs(NB_2PF, names, {'_np': np, '_cKDTree': cKDTree, '_lsa': linear_sum_assignment})
+
+
+def _clipped_lap(A, B, max_cost):
+    # Reference: dense distances clipped at max_cost, full LAP
+    from scipy.optimize import linear_sum_assignment
+    from scipy.spatial.distance import cdist
+    C = np.minimum(cdist(A, B), max_cost)
+    r, c = linear_sum_assignment(C)
+    return C[r, c].sum(), {(i, j) for i, j in zip(r, c) if C[i, j] < max_cost}
+
+
+def _gated_result(match, A, B, max_cost):
+    d, c, r = match(A, B, max_cost)
+    return d.sum(), {(i, j) for i, j, dd in zip(r, c, d) if dd < max_cost}
+
+
+def check_hungarian_match():
+    rng = np.random.default_rng(0)
+    cases = []
+    for _ in range(100):
+        A = rng.uniform(0, 60, (int(rng.integers(1, 80)), 3))
+        B = rng.uniform(0, 60, (int(rng.integers(1, 80)), 3))
+        cases.append((A, B, float(rng.uniform(2, 20))))
+    # Coincident centroids (zero distance) must still be matched
+    A = rng.uniform(0, 60, (30, 3))
+    cases.append((A, A[::-1].copy(), 1.0))
+    cases.append((A, np.vstack([A[:10], rng.uniform(100, 160, (5, 3))]), 1.0))
+    for nb_name, ns in _hungarian_defs():
+        for A, B, max_cost in cases:
+            ref_cost, ref_pairs = _clipped_lap(A, B, max_cost)
+            cost, pairs = _gated_result(ns['hungarian_match'], A, B, max_cost)
+            assert np.isclose(cost, ref_cost), f'{nb_name}: gated LAP cost {cost:.4f} vs clipped dense {ref_cost:.4f}'
+            assert pairs == ref_pairs, f'{nb_name}: gated LAP in-gate pairs differ from the clipped dense LAP'
+
+
+CHECKS = [
+    check_corrcoef_img,
+    check_parse_kv,
+    check_hungarian_match,
+]
+
+
+def main():
+    for check in CHECKS:
+        check()
+        print(f'ok  {check.__name__}')
+
+
+if __name__ == '__main__':
+    main()
@@ -41,7 +41,7 @@ def update_notebook(nb_path: Path) -> None:
                         "        'conf_arr': conf_labels_2p,\n"
                         "        'df_conf': df_conf,\n"
                         "        'P_conf_um': P_conf_in_2p_um,\n"
-                        "        'conf_lut': dict(zip(df_conf['label'].to_numpy(), P_conf_in_2p_um)),\n"
+                        "        'conf_lut_arr': _coords_lut(df_conf['label'].to_numpy(), P_conf_in_2p_um),\n"
                         "    }\n"
                     )
                     src = src.replace(target, inject)